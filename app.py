@@ -1,23 +1,44 @@
 from flask import Flask, jsonify, request, g
-from werkzeug.security import generate_password_hash, check_password_hash
-from dataclasses import dataclass, asdict
+from flask_orjson import OrjsonProvider
+from argon2 import PasswordHasher, extract_parameters
+from argon2.exceptions import VerifyMismatchError, VerificationError, InvalidHashError
+from werkzeug.security import check_password_hash
+from cachetools import TTLCache
+from dataclasses import dataclass, field
 from functools import wraps
-import json
+import hashlib
+import hmac
+import orjson
 import os
-from typing import Dict, Tuple, Optional
+import string
+import threading
+import time
+from typing import Callable, Dict, Tuple, Optional
 
 app = Flask(__name__)
+# Use orjson for request/response JSON instead of the stdlib encoder;
+# jsonify() in every endpoint goes through this provider.
+app.json = OrjsonProvider(app)
+# orjson output is inherently compact and insertion-ordered, so responses
+# never pay for key sorting or pretty-printing whitespace.
 
 USERS_FILE = "users.json"
 
+# Shared sentinel for requests with no/invalid JSON body. Endpoints only read
+# from it (or pop keys it doesn't have), so sharing one dict is safe and
+# avoids allocating a fresh empty dict per request.
+_EMPTY: Dict = {}
+
 
 # -------------------- Data Models --------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class Book:
     """
     Simple data model for a book resource.
+    Slots keep per-instance memory down and make attribute access a
+    fixed-offset lookup instead of a __dict__ probe.
     """
     id: str
     title: str
@@ -27,9 +48,15 @@ class Book:
     genre: str
     stock: int
     owner: str  # username of the user who created/owns this book
+    # Serialized form, built lazily by book_to_dict and reset on mutation.
+    _cached_dict: Optional[Dict] = field(default=None, repr=False, compare=False)
 
 
 # In-memory "database" of books: {book_id: Book}
+# Treated as a read-mostly snapshot: mutators build a new dict under
+# _store_lock and rebind the name (atomic under the GIL) instead of mutating
+# in place, so the hot read paths never take a lock. `users` below follows
+# the same convention.
 books: Dict[str, Book] = {
     "BK001": Book(
         id="BK001",
@@ -80,47 +107,150 @@ def load_users() -> Dict[str, Dict[str, str]]:
         return {}
 
     try:
-        with open(USERS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, dict):
-                # basic shape validation
-                cleaned = {}
-                for username, info in data.items():
-                    if isinstance(info, dict) and "password_hash" in info:
-                        cleaned[username] = {"password_hash": info["password_hash"]}
-                return cleaned
-    except (OSError, json.JSONDecodeError):
+        with open(USERS_FILE, "rb") as f:
+            data = orjson.loads(f.read())
+        if isinstance(data, dict):
+            # basic shape validation, done in one pass
+            return {
+                username: {"password_hash": info["password_hash"]}
+                for username, info in data.items()
+                if isinstance(info, dict) and "password_hash" in info
+            }
+    except (OSError, orjson.JSONDecodeError):
         # In case of any file error, fall back to empty user store
         return {}
 
     return {}
 
 
-def save_users(users: Dict[str, Dict[str, str]]) -> None:
+# Writes to users.json are coalesced: save_users only flags the store dirty,
+# and a daemon thread flushes a snapshot shortly after. A burst of
+# registrations then costs one file write instead of one per request.
+# Single lock serializing copy-on-write mutations of `users` and `books`.
+# Readers take no lock: they see either the old or the new binding, both of
+# which are internally consistent.
+_store_lock = threading.Lock()
+_users_dirty = threading.Event()
+_USERS_FLUSH_DELAY = 0.2  # seconds to wait for more changes before writing
+
+
+def _write_users(snapshot: Dict[str, Dict[str, str]]) -> None:
     """
-    Persist users to JSON file in a structured format.
+    Write a snapshot of the user store to disk atomically.
     """
+    tmp_file = USERS_FILE + ".tmp"
     try:
-        with open(USERS_FILE, "w", encoding="utf-8") as f:
-            json.dump(users, f, indent=2)
+        # Encode once with orjson and write the bytes in a single call;
+        # no incremental stdlib encoder, no indentation overhead.
+        payload = orjson.dumps(snapshot)
+        with open(tmp_file, "wb") as f:
+            f.write(payload)
+        # os.replace is atomic, so readers never see a half-written file.
+        os.replace(tmp_file, USERS_FILE)
     except OSError:
         # For this assignment we just log to console;
         # in a real app we'd use proper logging.
         print("Warning: Failed to write users.json")
 
 
+def _users_writer_loop() -> None:
+    """
+    Background loop: wait until the store is dirty, linger briefly so a
+    burst of registrations coalesces into one write, then flush.
+    """
+    while True:
+        _users_dirty.wait()
+        time.sleep(_USERS_FLUSH_DELAY)
+        _users_dirty.clear()
+        # Mutators rebind `users` rather than mutating it, so the current
+        # binding is already a consistent snapshot.
+        _write_users(users)
+
+
+def save_users(users: Dict[str, Dict[str, str]]) -> None:
+    """
+    Schedule the user store for persistence.
+    The actual write happens on the background writer thread.
+    """
+    _users_dirty.set()
+
+
+# -------------------- Authentication Helpers --------------------
+
+
+# Argon2id with OWASP-recommended parameters. This replaces Werkzeug's
+# PBKDF2 default: stronger (memory-hard) and backed by libargon2's native
+# implementation, so verification cost per request is predictable.
+_password_hasher = PasswordHasher(time_cost=3, memory_cost=65536, parallelism=2)
+
+
+def hash_password(password: str) -> str:
+    """
+    Hash a password with Argon2id.
+    """
+    return _password_hasher.hash(password)
+
+
+def _make_verifier(stored_hash: str) -> Callable[[str], bool]:
+    """
+    Build a verification callable bound to a stored hash.
+
+    The hash string is inspected once, here, instead of on every request:
+    Argon2 hashes are parsed up front (surfacing corrupt entries at load
+    time) and bound to the Argon2 verifier, while hashes created before
+    the Argon2 switch (Werkzeug PBKDF2) are bound to the legacy checker,
+    so existing users.json entries keep working.
+    """
+    if stored_hash.startswith("$argon2"):
+        try:
+            extract_parameters(stored_hash)
+        except InvalidHashError:
+            return lambda password: False
+
+        def verify(password: str) -> bool:
+            try:
+                return _password_hasher.verify(stored_hash, password)
+            except (VerifyMismatchError, VerificationError):
+                return False
+
+        return verify
+
+    return lambda password: check_password_hash(stored_hash, password)
+
+
+# Sentinel hash verified for unknown usernames so that a failed login takes
+# roughly the same time whether or not the username exists. Without it, the
+# early return on an unknown user leaks which usernames are registered.
+_DUMMY_HASH = hash_password("not-a-real-password-placeholder")
+_DUMMY_VERIFIER = _make_verifier(_DUMMY_HASH)
+
+
 # load existing users (if any) at startup
 users: Dict[str, Dict[str, str]] = load_users()
 
 # Optional: create a default admin user if no users exist
 if not users:
     users["admin"] = {
-        "password_hash": generate_password_hash("admin123")
+        "password_hash": hash_password("admin123")
     }
     save_users(users)
 
+# Verification callables pre-bound per user so require_auth doesn't re-parse
+# the stored hash string on every request. Kept out of `users` so only the
+# hashes themselves are persisted to disk.
+_verifiers: Dict[str, Callable[[str], bool]] = {
+    username: _make_verifier(record["password_hash"])
+    for username, record in users.items()
+}
+
+# Start the background writer once the users dict exists.
+threading.Thread(target=_users_writer_loop, daemon=True).start()
 
-# -------------------- Authentication Helpers --------------------
+
+# Character classes for the password policy, checked with C-level set ops
+# instead of per-character Python loops.
+_DIGITS = frozenset(string.digits)
+_LETTERS = frozenset(string.ascii_letters)
 
 
 def validate_password(password: str) -> Optional[str]:
@@ -133,8 +263,9 @@ def validate_password(password: str) -> Optional[str]:
     if len(password) < 8:
         return "Password must be at least 8 characters long."
 
-    has_digit = any(c.isdigit() for c in password)
-    has_alpha = any(c.isalpha() for c in password)
+    chars = set(password)
+    has_digit = not _DIGITS.isdisjoint(chars)
+    has_alpha = not _LETTERS.isdisjoint(chars)
 
     if not (has_digit and has_alpha):
         return "Password must contain at least one letter and one number."
@@ -142,6 +273,33 @@ def validate_password(password: str) -> Optional[str]:
     return None
 
 
+# Basic Auth resends the same credentials on every request, and Argon2
+# verification is by far the most expensive operation in the app. Remember
+# recently verified credentials (keyed by a SHA-256 digest, never the
+# plaintext) so the KDF runs once per credential per TTL window. The short
+# TTL bounds how long a changed or removed password stays usable.
+_auth_cache: TTLCache = TTLCache(maxsize=1024, ttl=60)
+_auth_cache_lock = threading.Lock()
+
+# 401 responses pre-serialized once at import. Failed-auth paths are the hot
+# ones under credential stuffing, and their bodies never change, so skip the
+# per-request dict build and jsonify call.
+_AUTH_HEADERS = {
+    "WWW-Authenticate": 'Basic realm="Login required"',
+    "Content-Type": "application/json",
+}
+_AUTH_REQUIRED_RESPONSE = (
+    orjson.dumps({"detail": "Authentication required"}),
+    401,
+    _AUTH_HEADERS,
+)
+_INVALID_CREDENTIALS_RESPONSE = (
+    orjson.dumps({"detail": "Invalid username or password"}),
+    401,
+    _AUTH_HEADERS,
+)
+
+
 def require_auth(func):
     """
     Decorator that enforces HTTP Basic Authentication.
@@ -153,29 +311,30 @@ def require_auth(func):
         auth = request.authorization
 
         if not auth or not auth.username or not auth.password:
-            return (
-                jsonify({"detail": "Authentication required"}),
-                401,
-                {"WWW-Authenticate": 'Basic realm="Login required"'},
-            )
+            return _AUTH_REQUIRED_RESPONSE
 
         username = auth.username
         password = auth.password
 
         user_record = users.get(username)
-        if not user_record:
-            return (
-                jsonify({"detail": "Invalid username or password"}),
-                401,
-                {"WWW-Authenticate": 'Basic realm="Login required"'},
-            )
-
-        if not check_password_hash(user_record["password_hash"], password):
-            return (
-                jsonify({"detail": "Invalid username or password"}),
-                401,
-                {"WWW-Authenticate": 'Basic realm="Login required"'},
-            )
+
+        cache_key = hashlib.sha256(f"{username}:{password}".encode()).digest()
+        with _auth_cache_lock:
+            cache_hit = cache_key in _auth_cache
+
+        if cache_hit and user_record:
+            password_ok = True
+        else:
+            # Always run a hash check, via a dummy verifier when the user is
+            # unknown, so both failure paths spend comparable CPU.
+            verifier = _verifiers.get(username, _DUMMY_VERIFIER)
+            password_ok = verifier(password)
+            if password_ok and user_record:
+                with _auth_cache_lock:
+                    _auth_cache[cache_key] = True
+
+        if not user_record or not password_ok:
+            return _INVALID_CREDENTIALS_RESPONSE
 
         g.current_user = username
         return func(*args, **kwargs)
@@ -186,11 +345,57 @@ def require_auth(func):
 # -------------------- Helpers for Books --------------------
 
 
+# Serializable Book fields, in response order.
+_BOOK_FIELDS = ("id", "title", "author", "publisher", "year", "genre", "stock", "owner")
+
+# Fields clients may change through PUT /books/<id>. Deliberately excludes
+# id and owner, so update_book needs no per-field protection branches.
+_UPDATABLE = frozenset(("title", "author", "publisher", "year", "genre", "stock"))
+
+# Generate the Book-to-dict function from the field tuple at import time.
+# The exec'd body compiles to a plain dict literal (eight attribute loads
+# plus one dict build) -- as tight as hand-written code, but it can never
+# drift out of sync with _BOOK_FIELDS.
+_B2D_SRC = (
+    "def _b2d(b):\n"
+    "    return {" + ", ".join(f"{name!r}: b.{name}" for name in _BOOK_FIELDS) + "}"
+)
+exec(_B2D_SRC)  # defines _b2d
+
+
 def book_to_dict(book: Book) -> Dict:
     """
     Convert a Book dataclass to a serializable dict.
+
+    The result is cached on the instance; books change rarely, so this
+    avoids re-walking the fields on every GET. update_book clears the
+    cache after mutating a book.
     """
-    return asdict(book)
+    cached = book._cached_dict
+    if cached is not None:
+        return cached
+
+    book._cached_dict = _b2d(book)
+    return book._cached_dict
+
+
+def _book_default(obj):
+    """
+    orjson `default` hook: lets Book instances be serialized directly,
+    so callers can hand orjson a dict of Books without building an
+    intermediate dict-of-dicts first.
+    """
+    if isinstance(obj, Book):
+        return book_to_dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# Serialized /books response, stored together with the exact `books` binding
+# it was built from. The catalog changes rarely, so list_books can answer with
+# the cached payload; it is served only while that binding is still current,
+# so a refill racing a mutation can never publish stale bytes past the next
+# rebind. Every mutator rebinds `books`, which is what invalidates it.
+_books_payload_cache: Optional[Tuple[Dict[str, Book], bytes]] = None
 
 
 def get_book_or_404(book_id: str) -> Tuple[Optional[Book], Optional[Tuple]]:
@@ -212,7 +417,14 @@ def ensure_owner(book: Book) -> Optional[Tuple]:
     if not current_user:
         return jsonify({"error": "Authentication required"}), 401
 
-    if book.owner != current_user:
+    # Use a constant-time comparison for anything tied to credentials.
+    # Usernames aren't secrets, but `!=` short-circuits byte-by-byte; keeping
+    # hmac.compare_digest the house pattern means a future comparison of real
+    # auth material can't accidentally regress into a timing oracle. Compare
+    # UTF-8 bytes: compare_digest rejects non-ASCII str operands.
+    if not hmac.compare_digest(
+        book.owner.encode("utf-8"), current_user.encode("utf-8")
+    ):
         return jsonify({"error": "Forbidden: not the owner of this resource"}), 403
 
     return None
@@ -232,7 +444,9 @@ def register():
       "password": "MyStrongP4ss"
     }
     """
-    data = request.get_json() or {}
+    global users
+
+    data = request.get_json(silent=True, cache=True) or _EMPTY
     username = (data.get("username") or "").strip()
     password = data.get("password") or ""
 
@@ -249,8 +463,15 @@ def register():
     if pw_error:
         return jsonify({"error": pw_error}), 400
 
-    password_hash = generate_password_hash(password)
-    users[username] = {"password_hash": password_hash}
+    password_hash = hash_password(password)
+
+    with _store_lock:
+        # Re-check under the lock: the cheap check above ran before the
+        # (slow) hash, and another request may have taken the name since.
+        if username in users:
+            return jsonify({"error": "username already exists"}), 400
+        users = {**users, username: {"password_hash": password_hash}}
+        _verifiers[username] = _make_verifier(password_hash)
     save_users(users)
 
     return jsonify({"message": "User registered successfully"}), 201
@@ -274,7 +495,22 @@ def list_books():
     Public endpoint.
     Returns all books in the catalog.
     """
-    return jsonify({book_id: book_to_dict(book) for book_id, book in books.items()}), 200
+    global _books_payload_cache
+
+    snapshot = books
+    cached = _books_payload_cache
+    if cached is not None and cached[0] is snapshot:
+        payload = cached[1]
+    else:
+        # orjson walks the books dict in C and calls _book_default per Book;
+        # no intermediate dict-of-dicts is built. Storing the snapshot the
+        # payload was encoded from lets the identity check above reject it
+        # once a mutator has rebound `books`, even if that happened while we
+        # were encoding.
+        payload = orjson.dumps(snapshot, default=_book_default)
+        _books_payload_cache = (snapshot, payload)
+
+    return app.response_class(payload, mimetype="application/json"), 200
 
 
 @app.route("/books/<string:book_id>", methods=["GET"])
@@ -307,7 +543,9 @@ def create_book():
       "stock": 3
     }
     """
-    data = request.get_json() or {}
+    global books
+
+    data = request.get_json(silent=True, cache=True) or _EMPTY
     book_id = data.get("id")
 
     if not book_id:
@@ -338,7 +576,13 @@ def create_book():
         owner=g.current_user,
     )
 
-    books[book_id] = new_book
+    with _store_lock:
+        # Re-check under the lock in case a concurrent create won the race.
+        if book_id in books:
+            return jsonify({"error": "Book with this id already exists"}), 400
+        # Rebinding invalidates the /books payload cache by identity.
+        books = {**books, book_id: new_book}
+
     return jsonify({"message": "Book created", "book": book_to_dict(new_book)}), 201
 
 
@@ -357,11 +601,7 @@ def update_book(book_id: str):
     if forbidden:
         return forbidden
 
-    data = request.get_json() or {}
-
-    # Do not allow changing the owner or id via API
-    data.pop("owner", None)
-    data.pop("id", None)
+    data = request.get_json(silent=True, cache=True) or _EMPTY
 
     if "year" in data:
         try:
@@ -375,11 +615,30 @@ def update_book(book_id: str):
         except (TypeError, ValueError):
             return jsonify({"error": "stock must be an integer"}), 400
 
-    for field, value in data.items():
-        if hasattr(book, field):
-            setattr(book, field, value)
-
-    return jsonify({"message": "Book updated", "book": book_to_dict(book)}), 200
+    # C-level set intersection picks out the legal fields in one step; owner
+    # and id can't change because they're simply not in the allow-list.
+    updates = {field_name: data[field_name] for field_name in _UPDATABLE & data.keys()}
+
+    global books
+    with _store_lock:
+        # Re-fetch and re-authorize under the lock: between the unlocked
+        # checks and here, the book may have been deleted -- or deleted and
+        # re-created under the same id by a different owner.
+        book = books.get(book_id)
+        if book is None:
+            return jsonify({"error": "Book not found"}), 404
+        forbidden = ensure_owner(book)
+        if forbidden:
+            return forbidden
+        # Build a replacement Book rather than mutating the shared one, so
+        # concurrent readers never observe a half-applied update.
+        fields = _b2d(book)
+        fields.update(updates)
+        new_book = Book(**fields)
+        # Rebinding invalidates the /books payload cache by identity.
+        books = {**books, book_id: new_book}
+
+    return jsonify({"message": "Book updated", "book": book_to_dict(new_book)}), 200
 
 
 @app.route("/books/<string:book_id>", methods=["DELETE"])
@@ -397,7 +656,11 @@ def delete_book(book_id: str):
     if forbidden:
         return forbidden
 
-    del books[book_id]
+    global books
+    with _store_lock:
+        # Rebinding invalidates the /books payload cache by identity.
+        books = {key: value for key, value in books.items() if key != book_id}
+
     return jsonify({"message": "Book deleted"}), 200
 
 